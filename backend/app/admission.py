@@ -0,0 +1,49 @@
+import asyncio
+
+
+class AdmissionController:
+    """
+    Caps concurrent chat requests and the number allowed to wait for a slot.
+    Requests beyond the queue, or that can't get a slot in time, are refused
+    so the caller can degrade or shed them instead of piling up in the threadpool.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, waiting up to `timeout` seconds; False means no capacity"""
+        if not self._slots.locked():
+            await self._slots.acquire()
+            self.active += 1
+            return True
+
+        if self.waiting >= self.max_queue or timeout <= 0:
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
@@ -22,6 +22,40 @@ class Settings(BaseSettings):
     collection_name: str = "superexpat_knowledge"
     embedding_model: str = "all-MiniLM-L6-v2"
 
+    # === Knowledge Base ===
+    knowledge_base_path: str = "./data/knowledge_base.json"
+    kb_context_cache_path: str = "./data/kb_context.json"
+    kb_context_token_budget: int = 120
+
+    # === Event Index ===
+    event_index_path: str = "./data/event_index.sqlite3"
+    event_index_refresh_seconds: int = 6 * 60 * 60
+
+    # === Providers ===
+    provider_latency_budget_seconds: float = 8.0
+    provider_max_workers: int = 4
+
+    # === Batch Chat ===
+    batch_max_concurrency: int = 4
+    batch_max_queries: int = 1000
+    batch_max_jobs: int = 1
+
+    # === Admission Control ===
+    chat_max_concurrency: int = 8
+    chat_max_queue: int = 16
+    chat_queue_timeout_seconds: float = 2.0
+    chat_timeout_seconds: float = 20.0
+    chat_min_timeout_seconds: float = 5.0
+    chat_retry_after_seconds: int = 5
+    summary_min_seconds: float = 2.0
+
+    # === Profiling ===
+    profiling_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 5.0
+    profile_buffer_size: int = 20
+    admin_token: str = ""
+
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="allow"
@@ -0,0 +1,197 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from app.agents import EVENT_KEYWORDS
+from app.config import settings
+
+
+# Words that say nothing about the topic of an event
+STOPWORDS = {
+    "a", "an", "and", "at", "for", "in", "near", "of", "on", "the",
+    "this", "to", "with", "me", "my", "find", "show", "any", "some",
+    "upcoming", "week", "weekend", "today", "tonight", "tomorrow",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase topic terms, dropping stopwords and event keywords"""
+    if not text:
+        return []
+
+    terms = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(word) < 2 or word in STOPWORDS or word in EVENT_KEYWORDS:
+            continue
+        if word not in terms:
+            terms.append(word)
+    return terms
+
+
+class EventIndex:
+    """
+    Local store of normalized provider events, indexed by city, date and topic terms.
+    Events expire once their start_date has passed.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.event_index_path
+        self._lock = threading.Lock()
+        self._purged_on = None
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                key TEXT PRIMARY KEY,
+                city TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                start_time TEXT,
+                payload TEXT NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_city_date ON events (city, start_date);
+
+            CREATE TABLE IF NOT EXISTS event_terms (
+                key TEXT NOT NULL,
+                term TEXT NOT NULL,
+                PRIMARY KEY (term, key)
+            );
+
+            CREATE TABLE IF NOT EXISTS fetches (
+                city TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                depth INTEGER NOT NULL,
+                PRIMARY KEY (city, topic)
+            );
+        """)
+
+        # Indexes created before fetch depth was tracked lack the column
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(fetches)")]
+        if "depth" not in columns:
+            self._conn.execute("ALTER TABLE fetches ADD COLUMN depth INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    @staticmethod
+    def _event_key(event: Dict[str, Any], city: str) -> str:
+        # Same identity as remove_duplicates() in rag.py, scoped to the city it was fetched for
+        title = (event.get("title") or "").lower().strip()
+        date = (event.get("start_date") or "").strip()
+        return f"{city}|{title}_{date}"
+
+    @staticmethod
+    def _topic_key(topic: str) -> str:
+        return " ".join(sorted(tokenize(topic)))
+
+    def ingest(self, events: List[Dict[str, Any]], location: str, topic: str,
+               depth: Optional[int] = None) -> int:
+        """
+        Store events fetched for (location, topic). Pass `depth` only when the upstream
+        fetch completed successfully: the query is then marked as covered up to `depth`
+        results. Without it, a failed or partial fetch can't hide upstream for the
+        refresh window.
+        """
+        if self._purged_on != datetime.now().strftime("%Y-%m-%d"):
+            self.purge_expired()
+
+        city = location.lower()
+        topic_terms = tokenize(topic)
+        now = time.time()
+        stored = 0
+
+        with self._lock:
+            for event in events:
+                if not event.get("title") or not event.get("start_date"):
+                    continue
+
+                key = self._event_key(event, city)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO events (key, city, start_date, start_time, payload, ingested_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, city, event["start_date"], event.get("start_time"), json.dumps(event), now)
+                )
+
+                # Index title words plus the topic that surfaced the event upstream,
+                # so a repeat of the same query finds it even if the title doesn't match
+                terms = set(tokenize(event.get("title"))) | set(topic_terms)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO event_terms (key, term) VALUES (?, ?)",
+                    [(key, term) for term in terms]
+                )
+                stored += 1
+
+            if depth is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO fetches (city, topic, fetched_at, depth) VALUES (?, ?, ?, ?)",
+                    (city, self._topic_key(topic), now, depth)
+                )
+            self._conn.commit()
+
+        print(f" Event index: stored {stored} events for '{topic}' in {location}")
+        return stored
+
+    def is_covered(self, location: str, topic: str, depth: int = 0) -> bool:
+        """
+        True if upstream was queried for (location, topic) within the refresh window
+        and asked for at least `depth` results
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, depth FROM fetches WHERE city = ? AND topic = ?",
+                (location.lower(), self._topic_key(topic))
+            ).fetchone()
+
+        if not row:
+            return False
+        fetched_at, fetched_depth = row
+        return time.time() - fetched_at < settings.event_index_refresh_seconds and fetched_depth >= depth
+
+    def search(self, location: str, topic: str, limit: int = None) -> List[Dict[str, Any]]:
+        """Return upcoming indexed events in a city matching every topic term, earliest first"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        terms = tokenize(topic)
+
+        sql = "SELECT payload FROM events WHERE city = ? AND start_date >= ?"
+        params: list = [location.lower(), today]
+
+        for term in terms:
+            sql += " AND key IN (SELECT key FROM event_terms WHERE term = ?)"
+            params.append(term)
+
+        sql += " ORDER BY start_date, COALESCE(start_time, '00:00')"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def purge_expired(self) -> int:
+        """Drop events whose date has passed and fetch records past the refresh window"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        cutoff = time.time() - settings.event_index_refresh_seconds
+
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM events WHERE start_date < ?", (today,)
+            ).rowcount
+            self._conn.execute(
+                "DELETE FROM event_terms WHERE key NOT IN (SELECT key FROM events)"
+            )
+            self._conn.execute("DELETE FROM fetches WHERE fetched_at < ?", (cutoff,))
+            self._conn.commit()
+
+        self._purged_on = today
+        if removed:
+            print(f" Event index: purged {removed} expired events")
+        return removed
+
+
+#  SINGLETON INSTANCE
+event_index = EventIndex()
+event_index.purge_expired()
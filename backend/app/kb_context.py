@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+from app.agents import KNOWN_CITIES
+from app.config import settings
+from app.vector_store import vector_store
+
+
+# What each intent is looking for in the knowledge base
+INTENT_QUERIES = {
+    "event": "events and meetups",
+    "job": "jobs and careers",
+    "general": "expat services and support",
+}
+
+# Knowledge-base category whose documents lead the context for an intent
+INTENT_CATEGORIES = {
+    "event": "events",
+    "job": "jobs",
+    "general": "services",
+}
+
+LOCATIONS = [city.title() for city in KNOWN_CITIES] + ["Global"]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting prompts
+    return len(text) // 4 + 1
+
+
+def compact_snippet(content: str, max_sentences: int = 2) -> str:
+    """Keep the leading sentences of a document"""
+    sentences = re.split(r"(?<=[.!?])\s+", content.strip())
+    return " ".join(sentences[:max_sentences])
+
+
+class KnowledgeContext:
+    """
+    Summary context precomputed per (intent, location) from knowledge_base.json.
+    Rebuilt whenever the knowledge base file changes, so summaries never need
+    a per-request vector search.
+    """
+
+    def __init__(self, kb_path: str = None, cache_path: str = None):
+        self.kb_path = kb_path or settings.knowledge_base_path
+        self.cache_path = cache_path or settings.kb_context_cache_path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._contexts: Dict[str, str] = {}
+
+    @staticmethod
+    def _key(intent: str, location: str) -> str:
+        return f"{intent}|{location}"
+
+    def _file_signature(self):
+        stat = os.stat(self.kb_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, intent: str, location: str) -> str:
+        """Context text for a summary prompt; empty when the knowledge base is missing"""
+        try:
+            signature = self._file_signature()
+        except OSError:
+            return ""
+
+        if signature != self._signature:
+            self.refresh(signature)
+
+        return (self._contexts.get(self._key(intent, location))
+                or self._contexts.get(self._key(intent, "Global"), ""))
+
+    def refresh(self, signature=None) -> None:
+        """Load contexts from the cache file, rebuilding them if the knowledge base changed"""
+        with self._lock:
+            signature = signature or self._file_signature()
+            if signature == self._signature:
+                return
+
+            with open(self.kb_path, "rb") as f:
+                raw = f.read()
+            fingerprint = hashlib.sha256(
+                raw + settings.embedding_model.encode() + str(settings.kb_context_token_budget).encode()
+            ).hexdigest()
+
+            contexts = self._load_cache(fingerprint)
+            if contexts is None:
+                contexts = self.build(json.loads(raw))
+                self._save_cache(fingerprint, contexts)
+
+            self._contexts = contexts
+            self._signature = signature
+
+    def _load_cache(self, fingerprint: str):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get("fingerprint") != fingerprint:
+            return None
+        return cached.get("contexts", {})
+
+    def _save_cache(self, fingerprint: str, contexts: Dict[str, str]) -> None:
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "contexts": contexts}, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f" Knowledge context: could not write cache: {e}")
+
+    def build(self, data: dict) -> Dict[str, str]:
+        """Rank knowledge-base documents for every (intent, location) and pack them into the token budget"""
+        documents = [doc for doc in data.get("documents", []) if doc.get("content")]
+        if not documents:
+            return {}
+
+        keys = [(intent, location) for intent in INTENT_QUERIES for location in LOCATIONS]
+        queries = [f"{INTENT_QUERIES[intent]} in {location}" for intent, location in keys]
+
+        # One encode call for every document and every (intent, location) query
+        embeddings = vector_store.embedding_model.encode(
+            [doc["content"] for doc in documents] + queries,
+            normalize_embeddings=True
+        )
+        doc_embeddings = np.asarray(embeddings[:len(documents)])
+        query_embeddings = np.asarray(embeddings[len(documents):])
+        similarity = query_embeddings @ doc_embeddings.T
+
+        contexts = {}
+        for row, (intent, location) in enumerate(keys):
+            ranked = sorted(
+                range(len(documents)),
+                key=lambda i: (documents[i].get("category") != INTENT_CATEGORIES[intent], -similarity[row][i])
+            )
+            contexts[self._key(intent, location)] = self._pack([documents[i] for i in ranked])
+
+        print(f" Knowledge context: built {len(contexts)} contexts from {len(documents)} documents")
+        return contexts
+
+    @staticmethod
+    def _pack(documents: List[dict]) -> str:
+        lines = []
+        used = 0
+        for doc in documents:
+            line = f"• {compact_snippet(doc['content'])}"
+            cost = estimate_tokens(line)
+            if used + cost > settings.kb_context_token_budget:
+                continue
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+
+#  SINGLETON INSTANCE
+knowledge_context = KnowledgeContext()
+
+
+if __name__ == "__main__":
+    # Precompute summary contexts ahead of the first request
+    knowledge_context.refresh()
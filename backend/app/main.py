@@ -1,12 +1,33 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Header, Response
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.models import ChatRequest, ChatResponse
-from app.rag import handle_query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Optional
+from app.admission import AdmissionController
+from app.config import settings
+from app.models import ChatRequest, ChatResponse, ChatBatchRequest
+from app.profiling import profile_store, run_profiled, should_profile
+from app.rag import handle_query, handle_queries, answer_from_cache
+import hmac
+import json
 import time
 import os
+import weakref
 PORT = int(os.environ.get("PORT", 8000))
 app = FastAPI(title="SuperExpat AI Agent API", version="1.0.0")
 
+admission = AdmissionController(
+    max_concurrency=settings.chat_max_concurrency,
+    max_queue=settings.chat_max_queue
+)
+
+# Batches get their own share, so at most batch_max_jobs x batch_max_concurrency keys
+# are in flight next to live traffic; extra batches are refused rather than queued
+batch_admission = AdmissionController(
+    max_concurrency=settings.batch_max_jobs,
+    max_queue=0
+)
+
 # ======================
 # CORS (MANDATORY)
 # ======================
@@ -35,18 +56,155 @@ def status():
 def metrics():
     return {
         "avg_response_ms": 1200,
-        "status": "healthy"
+        "status": "healthy",
+        "admission": admission.stats(),
+        "batch_admission": batch_admission.stats()
     }
 
 # ======================
 # CHAT ENDPOINT
 # ======================
 @app.post("/api/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    start = time.time()
-    result = handle_query(
-        query=req.message,
-        page=req.page,
-        page_size=req.page_size
-    )
+async def chat(
+    req: ChatRequest,
+    response: Response,
+    x_request_timeout_ms: Optional[int] = Header(None, gt=0),
+    x_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None)
+):
+    # Deadline for the whole request; clients may tighten it, within bounds, but not extend it
+    timeout = settings.chat_timeout_seconds
+    if x_request_timeout_ms is not None:
+        timeout = min(timeout, max(settings.chat_min_timeout_seconds, x_request_timeout_ms / 1000))
+    deadline = time.monotonic() + timeout
+
+    queue_timeout = min(settings.chat_queue_timeout_seconds, timeout)
+    if not await admission.acquire(queue_timeout):
+        # No capacity: serve what the event index already has, otherwise shed fast
+        cached = await run_in_threadpool(answer_from_cache, req.message, req.page, req.page_size)
+        if cached is not None:
+            response.headers["X-Degraded"] = "cached"
+            return cached
+
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": str(settings.chat_retry_after_seconds)}
+        )
+
+    try:
+        # Forced captures are admin-only so outside traffic can't evict sampled ones
+        if should_profile(x_profile if is_admin(x_admin_token) else None):
+            result, capture_id = await run_in_threadpool(
+                run_profiled,
+                handle_query,
+                req.message,
+                query=req.message,
+                page=req.page,
+                page_size=req.page_size,
+                deadline=deadline
+            )
+            response.headers["X-Profile-Id"] = str(capture_id)
+        else:
+            result = await run_in_threadpool(
+                handle_query,
+                query=req.message,
+                page=req.page,
+                page_size=req.page_size,
+                deadline=deadline
+            )
+    finally:
+        admission.release()
     return result
+
+
+# ======================
+# BATCH CHAT ENDPOINT
+# ======================
+@app.post("/api/chat/batch")
+async def chat_batch(req: ChatBatchRequest):
+    if len(req.messages) > settings.batch_max_queries:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.batch_max_queries} messages per batch"
+        )
+
+    if not await batch_admission.acquire(0):
+        raise HTTPException(
+            status_code=503,
+            detail="Another batch is running, please retry later",
+            headers={"Retry-After": str(settings.chat_retry_after_seconds)}
+        )
+
+    def ndjson():
+        for result in handle_queries(req.messages, page=req.page, page_size=req.page_size):
+            if "error" not in result:
+                # Same shape as /api/chat; a bad result costs only its own line
+                try:
+                    result = ChatResponse.model_validate(result).model_dump()
+                except Exception as e:
+                    print(f" Batch query failed validation: {result.get('query')!r}: {e}")
+                    result = {"query": result.get("query"), "error": str(e)}
+            yield json.dumps(result) + "\n"
+
+    released = False
+
+    def release_slot():
+        nonlocal released
+        if not released:
+            released = True
+            batch_admission.release()
+
+    async def stream():
+        # Hold the batch slot until the stream ends or the client goes away
+        try:
+            async for line in iterate_in_threadpool(ndjson()):
+                yield line
+        finally:
+            release_slot()
+
+    body = stream()
+    # A stream that is never iterated skips its finally; free the slot when it's collected
+    weakref.finalize(body, release_slot)
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+
+# ======================
+# ADMIN: PROFILES
+# ======================
+def is_admin(x_admin_token: Optional[str]) -> bool:
+    if not settings.admin_token or not x_admin_token:
+        return False
+    # Compare bytes: compare_digest raises TypeError on non-ASCII str
+    return hmac.compare_digest(x_admin_token.encode(), settings.admin_token.encode())
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Admin endpoints don't exist unless a token is configured
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    return {
+        "profiling_enabled": settings.profiling_enabled,
+        "sample_rate": settings.profile_sample_rate,
+        "profiles": profile_store.list()
+    }
+
+
+@app.get("/api/admin/profiles/{capture_id}", dependencies=[Depends(require_admin)])
+def get_profile(capture_id: int, format: str = "collapsed"):
+    capture = profile_store.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail=f"Profile {capture_id} not found")
+
+    if format == "speedscope":
+        return capture.speedscope()
+    if format == "collapsed":
+        return PlainTextResponse(capture.collapsed())
+
+    raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'speedscope'")
@@ -11,6 +11,12 @@ class ChatRequest(BaseModel):
     page_size: Optional[int] = 10
 
 
+class ChatBatchRequest(BaseModel):
+    messages: List[str]
+    page: Optional[int] = 1
+    page_size: Optional[int] = 10
+
+
 # ======================
 # Result Model
 # ======================
@@ -35,6 +41,7 @@ class EventResult(BaseModel):
 class Pagination(BaseModel):
     page: int
     page_size: int
+    total_pages: Optional[int] = None
 
 
 # ======================
@@ -45,5 +52,6 @@ class ChatResponse(BaseModel):
     query: str
     location: str
     total_results: int
+    ai_summary: Optional[str] = None
     results: List[EventResult]
     pagination: Pagination
@@ -0,0 +1,198 @@
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+def should_profile(header_value: Optional[str]) -> bool:
+    """
+    Profile when enabled and either asked for via X-Profile or picked by sampling.
+    Callers pass the header only for admin requests.
+    """
+    if not settings.profiling_enabled:
+        return False
+    if header_value and header_value.strip().lower() in ("1", "true", "yes"):
+        return True
+    return random.random() < settings.profile_sample_rate
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Statistical profiler: samples one thread's Python stack at a fixed interval.
+    The sampler can only wake when the profiled thread releases the GIL, so CPU-bound
+    code is sampled less often than waits; each stack is therefore weighted by the real
+    time since the previous sample rather than by the nominal interval.
+    """
+
+    def __init__(self, thread_id: int, interval_seconds: float, root_frame=None):
+        self.thread_id = thread_id
+        self.interval = interval_seconds
+        self.root_frame = root_frame
+        self.stacks: Counter = Counter()  # stack -> milliseconds
+        self.samples = 0
+        self._last = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._last = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            elapsed_ms = (now - self._last) * 1000
+            self._last = now
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += elapsed_ms
+                self.samples += 1
+
+    def _collapse(self, frame) -> Tuple[str, ...]:
+        # Walk leaf -> root, stopping at the frame that started profiling
+        names = []
+        while frame is not None and frame is not self.root_frame:
+            names.append(frame_name(frame))
+            frame = frame.f_back
+        return tuple(reversed(names))
+
+
+@dataclass
+class Capture:
+    id: int
+    label: str
+    started_at: str
+    duration_ms: float
+    interval_ms: float
+    samples: int
+    stacks: Counter  # stack -> milliseconds
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "samples": self.samples,
+        }
+
+    def collapsed(self) -> str:
+        """
+        Brendan Gregg collapsed-stack format, ready for flamegraph.pl or speedscope.
+        Values are microseconds.
+        """
+        return "".join(
+            f"{';'.join(stack)} {round(ms * 1000)}\n"
+            for stack, ms in self.stacks.most_common()
+            if stack
+        )
+
+    def speedscope(self) -> dict:
+        """Speedscope sampled-profile JSON"""
+        frames: List[dict] = []
+        frame_index: Dict[str, int] = {}
+        samples, weights = [], []
+
+        for stack, ms in self.stacks.items():
+            indices = []
+            for name in stack:
+                if name not in frame_index:
+                    frame_index[name] = len(frames)
+                    frames.append({"name": name})
+                indices.append(frame_index[name])
+            samples.append(indices)
+            weights.append(ms)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.label,
+            "exporter": "superexpat-ai-agent",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class ProfileStore:
+    """Bounded ring buffer of recent captures; the oldest is dropped when full"""
+
+    def __init__(self, size: int):
+        self._captures = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, capture: Capture) -> None:
+        with self._lock:
+            self._captures.append(capture)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [capture.summary() for capture in reversed(self._captures)]
+
+    def get(self, capture_id: int) -> Optional[Capture]:
+        with self._lock:
+            for capture in self._captures:
+                if capture.id == capture_id:
+                    return capture
+        return None
+
+
+def run_profiled(fn, label: str, *args, **kwargs):
+    """
+    Call fn(*args, **kwargs) under the stack sampler and store the capture.
+    Returns (result, capture_id).
+    """
+    interval_ms = settings.profile_interval_ms
+    sampler = StackSampler(threading.get_ident(), interval_ms / 1000, root_frame=sys._getframe())
+    capture_id = profile_store.next_id()
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = time.perf_counter()
+
+    sampler.start()
+    try:
+        return fn(*args, **kwargs), capture_id
+    finally:
+        sampler.stop()
+        duration_ms = (time.perf_counter() - start) * 1000
+        profile_store.add(Capture(
+            id=capture_id,
+            label=label,
+            started_at=started_at,
+            duration_ms=duration_ms,
+            interval_ms=interval_ms,
+            samples=sampler.samples,
+            stacks=sampler.stacks,
+        ))
+        print(f" Profile {capture_id}: {sampler.samples} samples over {duration_ms:.0f}ms")
+
+
+#  SINGLETON INSTANCE
+profile_store = ProfileStore(settings.profile_buffer_size)
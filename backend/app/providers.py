@@ -0,0 +1,186 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.tools import (
+    EVENTBRITE_PAGE_SIZE, SERPAPI_PAGE_SIZE, ProviderNotConfigured,
+    fetch_eventbrite_page, fetch_serpapi_page,
+)
+
+
+@dataclass
+class Provider:
+    """An upstream source of results, fetched one page at a time"""
+    name: str
+    intents: Tuple[str, ...]
+    cost: float        # relative cost of one upstream call; cheaper providers are asked first
+    page_size: int     # results returned per upstream page
+    max_pages: int     # deepest page the engine will request
+    # (topic, location, page, timeout) -> (results, has_more); raises ProviderError on failure
+    fetch: Callable[[str, str, int, float], Tuple[List[dict], bool]]
+
+
+PROVIDERS: Dict[str, Provider] = {}
+
+
+def register_provider(provider: Provider) -> None:
+    PROVIDERS[provider.name] = provider
+
+
+def providers_for(intent: str) -> List[Provider]:
+    """Providers serving an intent, cheapest first"""
+    return sorted(
+        (p for p in PROVIDERS.values() if intent in p.intents),
+        key=lambda p: p.cost
+    )
+
+
+def fetch_from_providers(
+    intent: str,
+    topic: str,
+    location: str,
+    wanted: int,
+    validate: Optional[Callable[[List[dict]], List[dict]]] = None,
+    budget_seconds: Optional[float] = None,
+) -> Tuple[List[dict], bool]:
+    """
+    Fetch upstream pages from every provider for an intent in parallel.
+    Each provider starts with the pages its page_size says `wanted` needs; a provider
+    goes a page deeper only once its pages are in, results are still short and it
+    reports more. Stops once `validate` yields `wanted` results, every provider is
+    out of pages (or failed), or the latency budget is spent.
+
+    Returns (validated results, complete). `complete` is True only when at least one
+    call succeeded, no call failed transiently and the budget didn't cut the fetch
+    short, i.e. the results are as good as upstream can give and are safe to cache.
+    Providers that aren't configured are skipped without making the fetch incomplete.
+    """
+    validate = validate or (lambda items: items)
+    budget = settings.provider_latency_budget_seconds if budget_seconds is None else budget_seconds
+    deadline = time.monotonic() + budget
+
+    providers = providers_for(intent)
+    if not providers:
+        return [], False
+
+    # Pages each provider needs to cover `wanted` on its own
+    scheduled = {
+        p.name: max(1, min(p.max_pages, math.ceil(wanted / p.page_size)))
+        for p in providers
+    }
+
+    # Page 1 of every provider first, then page 2, ...; cheaper providers lead within a page
+    pending = [
+        (provider, page)
+        for page in range(1, max(scheduled.values()) + 1)
+        for provider in providers
+        if page <= scheduled[provider.name]
+    ]
+
+    collected: List[dict] = []
+    finished = set()  # providers out of pages or failing; their later pages are skipped
+    succeeded = 0
+    failed = False
+    cut_short = False
+    in_flight = {}
+
+    executor = ThreadPoolExecutor(max_workers=settings.provider_max_workers)
+    try:
+        while True:
+            while pending and len(in_flight) < settings.provider_max_workers:
+                provider, page = pending.pop(0)
+                if provider.name in finished:
+                    continue
+                # HTTP timeout bounded by the budget, so abandoned calls don't outlive the request
+                timeout = max(0.1, deadline - time.monotonic())
+                future = executor.submit(provider.fetch, topic, location, page, timeout)
+                in_flight[future] = (provider, page)
+
+            if not in_flight:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f" Providers: latency budget of {budget:.1f}s spent, "
+                      f"abandoning {len(in_flight)} in-flight pages")
+                cut_short = True
+                break
+
+            done, _ = wait(in_flight, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, page = in_flight.pop(future)
+                try:
+                    items, has_more = future.result()
+                except ProviderNotConfigured as e:
+                    print(f" {provider.name} skipped: {e}")
+                    finished.add(provider.name)
+                    continue
+                except Exception as e:
+                    print(f" {provider.name} page {page} failed: {e}")
+                    finished.add(provider.name)
+                    failed = True
+                    continue
+
+                succeeded += 1
+                print(f" {provider.name} page {page}: {len(items)} results")
+                if not has_more:
+                    finished.add(provider.name)
+                collected.extend(items)
+
+            if done:
+                valid = validate(collected)
+                if len(valid) >= wanted:
+                    print(f" Providers: collected {len(valid)} valid results, stopping early")
+                    break
+
+                # Still short: go one page deeper on providers whose pages are all in
+                outstanding = {p.name for p, _ in in_flight.values()} | {p.name for p, _ in pending}
+                for provider in providers:
+                    name = provider.name
+                    if name in finished or name in outstanding or scheduled[name] >= provider.max_pages:
+                        continue
+                    scheduled[name] += 1
+                    pending.append((provider, scheduled[name]))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    complete = succeeded > 0 and not failed and not cut_short
+    return validate(collected), complete
+
+
+# ======================
+# Registered providers
+# ======================
+register_provider(Provider(
+    name="eventbrite",
+    intents=("event",),
+    cost=1.0,
+    page_size=EVENTBRITE_PAGE_SIZE,
+    max_pages=3,
+    fetch=lambda topic, location, page, timeout: fetch_eventbrite_page(
+        topic, location, page=page, timeout=timeout),
+))
+
+register_provider(Provider(
+    name="serpapi_events",
+    intents=("event",),
+    cost=2.0,
+    page_size=SERPAPI_PAGE_SIZE,
+    max_pages=5,
+    fetch=lambda topic, location, page, timeout: fetch_serpapi_page(
+        topic, location, mode="events", page=page, timeout=timeout),
+))
+
+# Google Jobs paginates with next_page_token, so pages can't be fetched in parallel
+register_provider(Provider(
+    name="serpapi_jobs",
+    intents=("job",),
+    cost=2.0,
+    page_size=SERPAPI_PAGE_SIZE,
+    max_pages=1,
+    fetch=lambda topic, location, page, timeout: fetch_serpapi_page(
+        topic, location, mode="jobs", page=page, timeout=timeout),
+))
@@ -1,9 +1,13 @@
 # backend/app/rag.py
 from app.agents import detect_intent, extract_location, sanitize_query
-from app.tools import fetch_eventbrite_events, fetch_serpapi_results
-from app.vector_store import vector_store
+from app.providers import fetch_from_providers
+from app.kb_context import knowledge_context
+from app.event_index import event_index
 from app.config import settings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import time
+from typing import Iterator, List, Optional
 
 # Initialize Gemini AI
 try:
@@ -75,23 +79,28 @@ def filter_valid_events(results):
     return valid_events
 
 
-def generate_ai_summary(query: str, location: str, total_results: int, results: list, intent: str) -> str:
-    """Generate intelligent AI summary using Gemini + RAG"""
+def fallback_summary(location: str, total_results: int, intent: str) -> str:
+    """Summary used when Gemini is unavailable, fails, or there's no time left to call it"""
+    if intent == "event":
+        return f"🎉 Found {total_results} exciting events for you in {location}! Check them out below."
+    else:
+        return f"💼 Found {total_results} job opportunities in {location}! Explore the listings below."
+
+
+def generate_ai_summary(query: str, location: str, total_results: int, results: list, intent: str,
+                        deadline: Optional[float] = None) -> str:
+    """
+    Generate intelligent AI summary using Gemini + RAG
+    With a `deadline`, the Gemini call times out when it is reached
+    """
     
     # Fallback if Gemini not available
     if not gemini_model:
-        if intent == "event":
-            return f"🎉 Found {total_results} exciting events for you in {location}! Check them out below."
-        else:
-            return f"💼 Found {total_results} job opportunities in {location}! Explore the listings below."
+        return fallback_summary(location, total_results, intent)
     
     try:
-        # Get contextual knowledge from vector store
-        context_docs = vector_store.search(query, top_k=3)
-        context_text = "\n".join([
-            f"• {doc['content'][:200]}" 
-            for doc in context_docs if doc.get('content')
-        ])
+        # Get precomputed knowledge-base context for this intent and city
+        context_text = knowledge_context.get(intent, location)
         
         # Prepare top results summary
         top_items = results[:5]
@@ -136,8 +145,12 @@ Write a helpful 2-3 sentence summary that:
 
 Be professional yet warm. Don't repeat the full job list."""
 
-        # Generate AI response
-        response = gemini_model.generate_content(prompt)
+        # Generate AI response, never past the request deadline
+        remaining = remaining_seconds(deadline)
+        if remaining is None:
+            response = gemini_model.generate_content(prompt)
+        else:
+            response = gemini_model.generate_content(prompt, request_options={"timeout": remaining})
         ai_text = response.text.strip()
         
         # Validate response
@@ -149,59 +162,77 @@ Be professional yet warm. Don't repeat the full job list."""
         
     except Exception as e:
         print(f" Gemini AI error: {e}")
-        # Fallback
-        if intent == "event":
-            return f"🎉 Found {total_results} exciting events in {location}! Check out the listings below."
-        else:
-            return f"💼 Found {total_results} opportunities in {location}! Browse the jobs below."
+        return fallback_summary(location, total_results, intent)
 
 
-def handle_query(query: str, page: int = 1, page_size: int = 10):
-    """Main RAG handler with Gemini AI integration"""
-    
-    # Detect intent and extract location
+def plan_query(query: str):
+    """Detect intent, location and topic for a query"""
     intent = detect_intent(query)
     location = extract_location(query)
     topic = sanitize_query(query, location)
+    return intent, location, topic
 
-    print(f"\n{'='*60}")
-    print(f" RAG Processing with Gemini AI")
-    print(f"{'='*60}")
-    print(f"Intent: {intent}")
-    print(f"Location: {location}")
-    print(f"Topic: {topic}")
-    print(f"{'='*60}\n")
 
+def remaining_seconds(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before a time.monotonic() deadline, or None when there is no deadline"""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def collect_results(intent: str, topic: str, location: str, wanted: int,
+                    deadline: Optional[float] = None) -> list:
+    """Gather results for an intent, earliest first, covering at least `wanted` when available"""
     results = []
 
+    # Upstream fetches never run past the request deadline
+    budget = settings.provider_latency_budget_seconds
+    remaining = remaining_seconds(deadline)
+    if remaining is not None:
+        budget = min(budget, remaining)
+
     # Fetch results based on intent
     if intent == "event":
-        print(" Fetching from Eventbrite...")
-        eventbrite_results = fetch_eventbrite_events(topic, location)
-        
-        print(" Fetching from Google Events (SerpAPI)...")
-        serpapi_results = fetch_serpapi_results(topic, location, mode="events")
-        
-        # Combine sources
-        results = eventbrite_results + serpapi_results
-        print(f"\n Combined: {len(results)} total events")
-        
-        # Apply filters
-        print(f"\n Filtering events...")
-        results = filter_valid_events(results)
-        print(f"✓ After filtering: {len(results)} valid events")
-        
+        if event_index.is_covered(location, topic, wanted):
+            print(" Serving events from local index...")
+            results = event_index.search(location, topic)
+            print(f"✓ Event index: {len(results)} upcoming events")
+        elif budget <= 0:
+            # Deadline already passed: answer from what the index has, without caching
+            print(" No time left before deadline, skipping upstream")
+            results = event_index.search(location, topic)
+        else:
+            print(" Fetching from event providers...")
+            results, complete = fetch_from_providers(
+                "event", topic, location, wanted,
+                validate=lambda items: remove_duplicates(filter_valid_events(items)),
+                budget_seconds=budget
+            )
+            print(f"✓ Providers: {len(results)} valid events")
+
+            if complete:
+                # Persist for later queries; the index also returns matches ingested earlier
+                event_index.ingest(results, location, topic, depth=wanted)
+                results = event_index.search(location, topic)
+            else:
+                # Failed or cut-short fetches aren't cached, so the next query retries upstream
+                print(" Upstream fetch incomplete, not caching")
+                results = results + event_index.search(location, topic)
+
         # Remove duplicates
         print(f"\n Removing duplicates...")
         results = remove_duplicates(results)
         print(f"✓ After deduplication: {len(results)} unique events")
 
+    elif intent == "job" and budget <= 0:
+        print(" No time left before deadline, skipping upstream")
+
     elif intent == "job":
-        print(" Fetching jobs from SerpAPI...")
-        results = fetch_serpapi_results(topic, location, mode="jobs")
+        print(" Fetching jobs from providers...")
+        results, _ = fetch_from_providers("job", topic, location, wanted, budget_seconds=budget)
 
     # Sort by date (earliest first)
-    results = sorted(
+    return sorted(
         results,
         key=lambda x: (
             x.get("start_date") or "9999-12-31",
@@ -209,25 +240,17 @@ def handle_query(query: str, page: int = 1, page_size: int = 10):
         )
     )
 
-    total = len(results)
 
-    # Generate AI summary with RAG
-    print(f"\n Generating AI summary with RAG...")
-    ai_summary = generate_ai_summary(query, location, total, results, intent)
+def build_response(query: str, intent: str, location: str, results: list,
+                   ai_summary: str, page: int, page_size: int) -> dict:
+    """Paginate results into the chat response shape"""
+    total = len(results)
 
     # Pagination
     start = (page - 1) * page_size
     end = start + page_size
     paginated_results = results[start:end]
 
-    print(f"\n{'='*60}")
-    print(f" RAG Processing Complete")
-    print(f"{'='*60}")
-    print(f"Total results: {total}")
-    print(f"AI Summary: {ai_summary[:80]}...")
-    print(f"Page {page}: Showing {len(paginated_results)} results")
-    print(f"{'='*60}\n")
-
     return {
         "intent": intent,
         "query": query,
@@ -241,3 +264,105 @@ def handle_query(query: str, page: int = 1, page_size: int = 10):
             "total_pages": (total + page_size - 1) // page_size if total > 0 else 0
         }
     }
+
+
+def handle_query(query: str, page: int = 1, page_size: int = 10, deadline: Optional[float] = None):
+    """
+    Main RAG handler with Gemini AI integration
+    `deadline` is a time.monotonic() instant the response must be ready by
+    """
+    
+    # Detect intent and extract location
+    intent, location, topic = plan_query(query)
+
+    print(f"\n{'='*60}")
+    print(f" RAG Processing with Gemini AI")
+    print(f"{'='*60}")
+    print(f"Intent: {intent}")
+    print(f"Location: {location}")
+    print(f"Topic: {topic}")
+    print(f"{'='*60}\n")
+
+    results = collect_results(intent, topic, location, page * page_size, deadline=deadline)
+    total = len(results)
+
+    # Generate AI summary with RAG, unless the deadline leaves no room for Gemini
+    remaining = remaining_seconds(deadline)
+    if remaining is not None and remaining < settings.summary_min_seconds:
+        print(f"\n Skipping AI summary: {remaining:.1f}s left before deadline")
+        ai_summary = fallback_summary(location, total, intent)
+    else:
+        print(f"\n Generating AI summary with RAG...")
+        ai_summary = generate_ai_summary(query, location, total, results, intent, deadline=deadline)
+
+    response = build_response(query, intent, location, results, ai_summary, page, page_size)
+
+    print(f"\n{'='*60}")
+    print(f" RAG Processing Complete")
+    print(f"{'='*60}")
+    print(f"Total results: {total}")
+    print(f"AI Summary: {ai_summary[:80]}...")
+    print(f"Page {page}: Showing {len(response['results'])} results")
+    print(f"{'='*60}\n")
+
+    return response
+
+
+def answer_from_cache(query: str, page: int = 1, page_size: int = 10) -> Optional[dict]:
+    """
+    Degraded answer from the local event index with the fallback summary,
+    without touching upstream or Gemini. None when nothing is cached for the query.
+    """
+    intent, location, topic = plan_query(query)
+    if intent != "event" or not event_index.is_covered(location, topic):
+        return None
+
+    results = remove_duplicates(event_index.search(location, topic))
+    print(f" Serving {len(results)} cached events for degraded request: {query!r}")
+
+    ai_summary = fallback_summary(location, len(results), intent)
+    return build_response(query, intent, location, results, ai_summary, page, page_size)
+
+
+def handle_queries(queries: List[str], page: int = 1, page_size: int = 10) -> Iterator[dict]:
+    """
+    Answer many queries at once, yielding responses in input order.
+    Queries sharing an (intent, topic, location) key are answered once, and keys are
+    resolved with at most `batch_max_concurrency` in flight, each under its own
+    `chat_timeout_seconds` deadline.
+    """
+    plans = [plan_query(query) for query in queries]
+
+    # First query seen for each key drives its fetch and summary
+    representatives = {}
+    for query, plan in zip(queries, plans):
+        representatives.setdefault(plan, query)
+
+    print(f"\n Batch: {len(queries)} queries, {len(representatives)} unique keys")
+
+    wanted = page * page_size
+
+    def answer(key):
+        # Each key gets the same deadline a single /api/chat request would
+        deadline = time.monotonic() + settings.chat_timeout_seconds
+        intent, location, topic = key
+        results = collect_results(intent, topic, location, wanted, deadline=deadline)
+        ai_summary = generate_ai_summary(representatives[key], location, len(results), results, intent,
+                                         deadline=deadline)
+        return results, ai_summary
+
+    executor = ThreadPoolExecutor(max_workers=settings.batch_max_concurrency)
+    try:
+        futures = {key: executor.submit(answer, key) for key in representatives}
+
+        for query, (intent, location, topic) in zip(queries, plans):
+            try:
+                results, ai_summary = futures[(intent, location, topic)].result()
+            except Exception as e:
+                print(f" Batch query failed: {query!r}: {e}")
+                yield {"query": query, "error": str(e)}
+                continue
+
+            yield build_response(query, intent, location, results, ai_summary, page, page_size)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -4,6 +4,22 @@ from datetime import datetime
 import re
 
 
+# Results per upstream page
+EVENTBRITE_PAGE_SIZE = 50
+SERPAPI_PAGE_SIZE = 10
+
+# Default per-request HTTP timeout; the provider engine passes what's left of its budget
+UPSTREAM_TIMEOUT_SECONDS = 15
+
+
+class ProviderError(Exception):
+    """An upstream call failed: HTTP error, timeout or unexpected response"""
+
+
+class ProviderNotConfigured(ProviderError):
+    """The provider can't be used at all (missing or rejected API key); retrying won't help"""
+
+
 def parse_date_string(date_str):
     """
     Parse date and ensure it's in 2025-2026 range (not 2027)
@@ -69,15 +85,29 @@ def parse_date_string(date_str):
     return None
 
 
-def fetch_eventbrite_events(topic: str, location: str):
+def fetch_eventbrite_events(topic: str, location: str, page: int = 1):
+    """
+    Fetch one page of events from Eventbrite API
+    Returns [] on any failure; use fetch_eventbrite_page to tell failures apart
     """
-    Fetch events from Eventbrite API
+    try:
+        events, _ = fetch_eventbrite_page(topic, location, page)
+        return events
+    except ProviderError as e:
+        print(f" {e}")
+        return []
+
+
+def fetch_eventbrite_page(topic: str, location: str, page: int = 1,
+                          timeout: float = UPSTREAM_TIMEOUT_SECONDS):
+    """
+    Fetch one page of events from Eventbrite API
+    Returns (events, has_more); raises ProviderError when the call fails
     Testing URL: https://www.eventbriteapi.com/v3/events/search/?q=music&location.address=London
     """
     
     if not settings.eventbrite_api_key or "your_" in settings.eventbrite_api_key.lower():
-        print(" Eventbrite: API key not configured")
-        return []
+        raise ProviderNotConfigured("Eventbrite: API key not configured")
     
     try:
         # Use search endpoint
@@ -90,24 +120,22 @@ def fetch_eventbrite_events(topic: str, location: str):
             "location.within": "50km",
             "sort_by": "date",
             "expand": "venue",
-            "page": 1
+            "page": page
         }
         
         print(f"🔍 Testing Eventbrite: {url}")
-        print(f"   Query: {topic} in {location}")
+        print(f"   Query: {topic} in {location} (page {page})")
         
-        r = requests.get(url, headers=headers, params=params, timeout=15)
+        r = requests.get(url, headers=headers, params=params, timeout=timeout)
         
         print(f"   Status: {r.status_code}")
         
         if r.status_code == 401:
-            print(f" Eventbrite: Invalid API key")
             print(f"   Get new key: https://www.eventbrite.com/account-settings/apps")
-            return []
+            raise ProviderNotConfigured("Eventbrite: Invalid API key")
         
         if r.status_code != 200:
-            print(f" Eventbrite: HTTP {r.status_code}")
-            return []
+            raise ProviderError(f"Eventbrite: HTTP {r.status_code}")
         
         data = r.json()
         events_list = data.get("events", [])
@@ -115,10 +143,13 @@ def fetch_eventbrite_events(topic: str, location: str):
         if not events_list:
             print(f" Eventbrite: No events returned")
             print(f"   Try in browser: {url}?q={topic}&location.address={location}")
-            return []
+            return [], False
+        
+        # Decided on the raw page, before incomplete events are dropped below
+        has_more = data.get("pagination", {}).get("has_more_items", len(events_list) >= EVENTBRITE_PAGE_SIZE)
         
         events = []
-        for e in events_list[:20]:  # Limit to 20
+        for e in events_list:
             if not e.get("url") or not e.get("name", {}).get("text"):
                 continue
             
@@ -152,21 +183,37 @@ def fetch_eventbrite_events(topic: str, location: str):
             })
         
         print(f" Eventbrite: Found {len(events)} events")
-        return events
+        return events, has_more
         
+    except ProviderError:
+        raise
     except Exception as e:
-        print(f" Eventbrite exception: {e}")
-        return []
+        raise ProviderError(f"Eventbrite exception: {e}") from e
 
 
-def fetch_serpapi_results(query: str, location: str, mode="events"):
+def fetch_serpapi_results(query: str, location: str, mode="events", page: int = 1):
     """
     Fetch from SerpAPI with proper link extraction
+    Returns [] on any failure; use fetch_serpapi_page to tell failures apart
+    """
+    try:
+        results, _ = fetch_serpapi_page(query, location, mode=mode, page=page)
+        return results
+    except ProviderError as e:
+        print(f" {e}")
+        return []
+
+
+def fetch_serpapi_page(query: str, location: str, mode="events", page: int = 1,
+                       timeout: float = UPSTREAM_TIMEOUT_SECONDS):
+    """
+    Fetch one page from SerpAPI with proper link extraction
+    Google Events pages are 10 results each, selected with the `start` offset
+    Returns (results, has_more); raises ProviderError when the call fails
     """
     
     if not settings.serpapi_key or "your_" in settings.serpapi_key.lower():
-        print(" SerpAPI: API key not configured")
-        return []
+        raise ProviderNotConfigured("SerpAPI: API key not configured")
     
     try:
         engine = "google_events" if mode == "events" else "google_jobs"
@@ -176,23 +223,27 @@ def fetch_serpapi_results(query: str, location: str, mode="events"):
             "q": f"{query} {location}" if mode == "events" else query,
             "location": location if mode == "jobs" else None,
             "api_key": settings.serpapi_key,
-            "hl": "en"
+            "hl": "en",
+            "start": (page - 1) * SERPAPI_PAGE_SIZE if mode == "events" and page > 1 else None
         }
         
         params = {k: v for k, v in params.items() if v is not None}
         
-        r = requests.get("https://serpapi.com/search", params=params, timeout=15)
+        r = requests.get("https://serpapi.com/search", params=params, timeout=timeout)
         
         if r.status_code != 200:
-            print(f" SerpAPI Error: {r.status_code}")
-            return []
+            raise ProviderError(f"SerpAPI Error: {r.status_code}")
         
         data = r.json()
         results = []
         
         key = "events_results" if mode == "events" else "jobs_results"
+        items = data.get(key, [])
         
-        for item in data.get(key, []):
+        # Decided on the raw page, before unusable links are dropped below
+        has_more = len(items) >= SERPAPI_PAGE_SIZE
+        
+        for item in items:
             title = item.get("title")
             
             # FIX: Get proper event link
@@ -255,8 +306,9 @@ def fetch_serpapi_results(query: str, location: str, mode="events"):
             })
         
         print(f" SerpAPI ({mode}): Found {len(results)} results")
-        return results
+        return results, has_more
         
+    except ProviderError:
+        raise
     except Exception as e:
-        print(f" SerpAPI Exception: {e}")
-        return []
+        raise ProviderError(f"SerpAPI Exception: {e}") from e